@@ -1,68 +1,221 @@
 import json
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_ollama import ChatOllama
 import argparse
-import time
+import asyncio
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def wait_ollama(base_url, max_retries=5):
-    """Check if Ollama service is running"""
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+CACHE_DIR = Path.home() / ".cache" / "agents_demo"
+BATCH_CONCURRENCY = 8
+# Each agent answer is a small JSON object (<200 tokens); cap decoding per agent section.
+NUM_PREDICT_PER_AGENT = 256
+MIN_NUM_CTX = 2048
+TEMPERATURE = 0.2
+KEEP_ALIVE = "30m"
+
+if orjson is not None:
+    _loads = orjson.loads
+
+    def _dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+else:
+    _loads = json.loads
+
+    def _dumps(obj):
+        # Match orjson's compact output so prompts (and cache keys) don't depend on which is installed.
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+@lru_cache(maxsize=None)
+def get_session():
+    """Return a shared requests session so HTTP calls to Ollama reuse one keep-alive connection.
+
+    Connection errors and 502/503/504 are retried with exponential backoff (0.1s, 0.2s, 0.4s, ...).
+    """
     import requests
-    for i in range(max_retries):
-        try:
-            response = requests.get(f"{base_url}/api/version", timeout=3)
-            if response.status_code == 200:
-                return True
-        except Exception:
-            time.sleep(1)
-    return False
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    retry = Retry(total=5, backoff_factor=0.1, status_forcelist=[502, 503, 504])
+    session.mount("http://", HTTPAdapter(max_retries=retry))
+    session.mount("https://", HTTPAdapter(max_retries=retry))
+    return session
+
+
+def wait_ollama(base_url):
+    """Check if Ollama service is running"""
+    try:
+        response = get_session().get(f"{base_url}/api/version", timeout=2)
+    except Exception:
+        return False
+    return response.status_code == 200
+
+
+def warm_model(model, base_url, num_ctx=MIN_NUM_CTX):
+    """Load the model into memory with an empty generate request so the first agent call doesn't pay for it"""
+    try:
+        # Load with the same num_ctx the agents use, otherwise Ollama reloads on the first call.
+        payload = {"model": model, "keep_alive": KEEP_ALIVE, "options": {"num_ctx": num_ctx}}
+        get_session().post(f"{base_url}/api/generate", json=payload, timeout=60)
+    except Exception:
+        pass
 
 
-def ask_ollama(prompt, model="phi3:3.8b", base_url="http://127.0.0.1:11434"):
-    """Send prompt to Ollama using LangChain and return response"""
-    llm = ChatOllama(
+@lru_cache(maxsize=None)
+def get_llm(model, base_url, num_ctx=MIN_NUM_CTX, num_predict=NUM_PREDICT_PER_AGENT, schema="agent"):
+    """Return a shared ChatOllama so every call reuses its underlying HTTP client and keep-alive connection."""
+    return ChatOllama(
         model=model,
-        temperature=0.2,
+        temperature=TEMPERATURE,
         base_url=base_url,
-        num_ctx=2048,
-        format="json",
+        num_ctx=num_ctx,
+        num_predict=num_predict,
+        format=RESPONSE_SCHEMAS[schema],
+        keep_alive=KEEP_ALIVE,
     )
-    response = llm.invoke(prompt)
-    return response.content
 
 
-def planner_prompt(topic, content):
-    """Prompt for Planner agent to generate tags and summary with thought and message."""
-    content_section = f"\nContent to analyze: {content}\n" if content else ""
-    return f'''You are Planner.
-Analyze the topic and content carefully. Check if the topic matches the content.
+def _num_ctx(messages, num_predict):
+    """Context window for a prompt: roughly 3 chars per token plus the answer, in power-of-two steps.
 
-First, write a brief thought about whether the topic and content align.
-Then, write a one-sentence message about your analysis.
-Generate tags and summary based on the ACTUAL CONTENT, not just the topic title.
+    Windows never drop below MIN_NUM_CTX; see run_num_ctx for how one window is picked per run.
+    """
+    needed = sum(len(m.content) for m in messages) // 3 + num_predict
+    num_ctx = MIN_NUM_CTX
+    while num_ctx < needed:
+        num_ctx *= 2
+    return num_ctx
 
-CRITICAL: You must provide EXACTLY 3 tags - no more, no less.
 
-If topic and content don't match, add this to issues: "Topic does not match content"
+class _JsonCollector:
+    """Accumulates streamed text up to the end of the first JSON object; complete is set once it closes."""
 
-Respond ONLY with a JSON object in this format:
-{{
+    def __init__(self):
+        self.parts = []
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.complete = False
+
+    def feed(self, text):
+        """Add a chunk and return the part of it kept; text after the closing brace is dropped."""
+        if self.complete:
+            return ""
+        for i, ch in enumerate(text):
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.complete = True
+                    text = text[:i + 1]
+                    break
+        self.parts.append(text)
+        return text
+
+    def text(self):
+        return "".join(self.parts)
+
+
+def _cache_path(messages, model, num_predict, schema):
+    """On-disk cache file for a prompt and every generation setting that shapes its answer."""
+    settings = [model, str(TEMPERATURE), str(num_predict), json.dumps(RESPONSE_SCHEMAS[schema], sort_keys=True)]
+    key = hashlib.sha256("\x00".join([*settings, *(m.content for m in messages)]).encode("utf-8")).hexdigest()
+    return CACHE_DIR / f"{key}.txt"
+
+
+def _save_answer(path, answer):
+    """Write an answer to the on-disk cache atomically, so concurrent readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(answer)
+    Path(tmp).replace(path)
+
+
+async def ask_ollama_async(messages, model="phi3:3.8b", base_url="http://127.0.0.1:11434", use_cache=True,
+                           num_predict=NUM_PREDICT_PER_AGENT, schema="agent", on_chunk=None, num_ctx=MIN_NUM_CTX):
+    """Send messages to Ollama using LangChain and return response, reusing cached answers for identical prompts.
+
+    Async so that batch mode can keep several prompts in flight on the Ollama server at once.
+
+    on_chunk, if given, is called with each piece of freshly generated text (not for cached answers).
+    """
+    path = _cache_path(messages, model, num_predict, schema)
+    if use_cache and path.exists():
+        return path.read_text(encoding="utf-8")
+    # The stream is read to the end (format= makes Ollama stop right after the object) so the
+    # HTTP connection can be reused; the collector drops anything after the closing brace.
+    collector = _JsonCollector()
+    async for chunk in get_llm(model, base_url, num_ctx, num_predict, schema).astream(messages):
+        kept = collector.feed(chunk.content)
+        if kept and on_chunk is not None:
+            on_chunk(kept)
+    if not collector.complete:
+        raise ValueError("Model answer ended before its JSON object was closed.")
+    answer = collector.text()
+    if use_cache:
+        # Only cache answers that parse, so a bad generation is retried on the next run.
+        try:
+            extract_json(answer)
+        except ValueError:
+            pass
+        else:
+            _save_answer(path, answer)
+    return answer
+
+
+# System prompts are kept static so every call shares a byte-identical prefix
+# that Ollama can serve from its KV cache; per-call data goes in the HumanMessage.
+AGENT_JSON_FORMAT = '''Respond ONLY with a JSON object in this format:
+{
     "thought": "...",
     "message": "...",
-    "data": {{
+    "data": {
         "tags": ["tag1", "tag2", "tag3"],
         "summary": "..."
-    }},
+    },
     "issues": []
-}}
+}'''
+
+PLANNER_SYS = '''You are Planner.
+Analyze the topic and content carefully. Check if the topic matches the content.
+
+First, write a brief thought about whether the topic and content align.
+Then, write a one-sentence message about your analysis.
+Generate tags and summary based on the ACTUAL CONTENT, not just the topic title.
 
-Topic: {topic}{content_section}
-'''
+CRITICAL: You must provide EXACTLY 3 tags - no more, no less.
 
+If topic and content don't match, add this to issues: "Topic does not match content"
 
-def reviewer_prompt(topic, planner_output, content):
-    """Prompt for Reviewer agent to validate and possibly revise tags/summary, with thought and message."""
-    content_section = f"\nContent to analyze: {content}\n" if content else ""
-    return f'''You are Reviewer.
+''' + AGENT_JSON_FORMAT
+
+REVIEWER_SYS = '''You are Reviewer.
 Your job is to IMPROVE the Planner's output by checking:
 1. Do the tags match the ACTUAL CONTENT (not just the topic title)?
 2. Is the summary accurate for the ACTUAL CONTENT?
@@ -72,25 +225,162 @@ CRITICAL REQUIREMENTS:
 - You must provide EXACTLY 3 tags - no more, no less
 - If topic and content are mismatched, you MUST:
   * Create tags based on the ACTUAL CONTENT
-  * Write summary based on the ACTUAL CONTENT  
+  * Write summary based on the ACTUAL CONTENT
   * Add to issues: "Title '[topic]' does not match content about [actual content topic]"
 
 Make changes when needed. Don't just copy the Planner's output.
 
+''' + AGENT_JSON_FORMAT
+
+COMBINED_SYS = '''You play two agents in order and answer for both in ONE JSON object.
+
+[planner]
+You are Planner.
+Analyze the topic and content carefully. Check if the topic matches the content.
+Write a brief thought about whether the topic and content align, then a one-sentence message about your analysis.
+Generate tags and summary based on the ACTUAL CONTENT, not just the topic title.
+If topic and content don't match, add this to issues: "Topic does not match content"
+
+[reviewer]
+You are Reviewer.
+IMPROVE the [planner] section by checking:
+1. Do the tags match the ACTUAL CONTENT (not just the topic title)?
+2. Is the summary accurate for the ACTUAL CONTENT?
+3. Does the topic title match the content? If not, add to issues: "Title '[topic]' does not match content about [actual content topic]"
+Make changes when needed. Don't just copy the Planner's output.
+
+CRITICAL: Each section must provide EXACTLY 3 tags - no more, no less.
+
 Respond ONLY with a JSON object in this format:
-{{
-    "thought": "...",
-    "message": "...",
-    "data": {{
-        "tags": ["tag1", "tag2", "tag3"],
-        "summary": "..."
-    }},
-    "issues": []
-}}
+{
+    "planner": {
+        "thought": "...",
+        "message": "...",
+        "data": {
+            "tags": ["tag1", "tag2", "tag3"],
+            "summary": "..."
+        },
+        "issues": []
+    },
+    "reviewer": {
+        "thought": "...",
+        "message": "...",
+        "data": {
+            "tags": ["tag1", "tag2", "tag3"],
+            "summary": "..."
+        },
+        "issues": []
+    }
+}'''
 
-Topic: {topic}{content_section}
-Planner JSON: {json.dumps(planner_output, ensure_ascii=False)}
-'''
+
+BATCH_PLANNER_SYS = '''You are Planner.
+You receive several blogs as {"items": [{"id", "title", "content"}, ...]}.
+For EACH item, analyze its title and content carefully and check if they match.
+Write a brief thought about whether the title and content align, then a one-sentence message about your analysis.
+Generate tags and summary based on the ACTUAL CONTENT, not just the title.
+
+CRITICAL: Each result must provide EXACTLY 3 tags - no more, no less.
+
+If a title and its content don't match, add this to that result's issues: "Topic does not match content"
+
+Respond ONLY with a JSON object holding one result per item, using the item's id:
+{
+    "results": [
+        {
+            "id": 1,
+            "thought": "...",
+            "message": "...",
+            "data": {
+                "tags": ["tag1", "tag2", "tag3"],
+                "summary": "..."
+            },
+            "issues": []
+        }
+    ]
+}'''
+
+
+# JSON schemas handed to Ollama's constrained decoder, so answers always have
+# the expected keys and exactly 3 tags.
+AGENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "thought": {"type": "string"},
+        "message": {"type": "string"},
+        "data": {
+            "type": "object",
+            "properties": {
+                "tags": {"type": "array", "items": {"type": "string"}, "minItems": 3, "maxItems": 3},
+                "summary": {"type": "string"},
+            },
+            "required": ["tags", "summary"],
+        },
+        "issues": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["thought", "message", "data", "issues"],
+}
+
+RESPONSE_SCHEMAS = {
+    "agent": AGENT_SCHEMA,
+    "combined": {
+        "type": "object",
+        "properties": {"planner": AGENT_SCHEMA, "reviewer": AGENT_SCHEMA},
+        "required": ["planner", "reviewer"],
+    },
+    "batch_planner": {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"id": {"type": "integer"}, **AGENT_SCHEMA["properties"]},
+                    "required": ["id", *AGENT_SCHEMA["required"]],
+                },
+            },
+        },
+        "required": ["results"],
+    },
+}
+
+
+def _topic_message(topic, content):
+    """Dynamic tail shared by every agent: the topic and the content to analyze."""
+    content_section = f"\nContent to analyze: {content}\n" if content else ""
+    return f"Topic: {topic}{content_section}"
+
+
+def planner_prompt(topic, content):
+    """Prompt for Planner agent to generate tags and summary with thought and message."""
+    return [SystemMessage(PLANNER_SYS), HumanMessage(_topic_message(topic, content))]
+
+
+def reviewer_prompt(topic, planner_output, content):
+    """Prompt for Reviewer agent to validate and possibly revise tags/summary, with thought and message."""
+    human = _topic_message(topic, content) + f"\nPlanner JSON: {_dumps(planner_output)}\n"
+    return [SystemMessage(REVIEWER_SYS), HumanMessage(human)]
+
+
+def combined_prompt(topic, content):
+    """Prompt that runs Planner and Reviewer in a single call, one labeled section per agent."""
+    return [SystemMessage(COMBINED_SYS), HumanMessage(_topic_message(topic, content))]
+
+
+def batch_planner_prompt(blogs):
+    """Prompt for Planner agent covering several (title, content) blogs in one call, identified by id."""
+    items = [{"id": i, "title": t, "content": c} for i, (t, c) in enumerate(blogs, 1)]
+    return [SystemMessage(BATCH_PLANNER_SYS), HumanMessage(_dumps({"items": items}))]
+
+
+def extract_json(text):
+    """Parse the first JSON object in a model response, ignoring any text around it."""
+    try:
+        return _loads(text)
+    except ValueError:
+        pass
+    obj, _ = json.JSONDecoder().raw_decode(text, text.index('{'))
+    return obj
 
 
 def finalizer(planner_json, reviewer_json, topic, content, email):
@@ -121,16 +411,211 @@ def finalizer(planner_json, reviewer_json, topic, content, email):
     return finalized
 
 
+def parse_answer(stage, raw, verbose=False):
+    """Parse one agent answer, optionally printing it, and name the stage if it is not a JSON object."""
+    if verbose:
+        print(f"\n--- {stage} ---\n")
+        print(raw)
+    try:
+        obj = extract_json(raw)
+    except ValueError as e:
+        raise ValueError(f"{stage} did not return valid JSON.") from e
+    if not isinstance(obj, dict):
+        raise ValueError(f"{stage} did not return valid JSON.")
+    return obj
+
+
+async def process_one(topic, content, args, semaphore, verbose=False):
+    """Run Planner and Reviewer for one blog, holding a semaphore slot while talking to Ollama.
+
+    With verbose, each raw agent answer is printed as soon as it arrives.
+    """
+    use_cache = not args.no_cache
+    async with semaphore:
+        if not args.two_pass:
+            combined_raw = await ask_ollama_async(
+                combined_prompt(topic, content), args.model, args.base_url, use_cache,
+                num_predict=2 * NUM_PREDICT_PER_AGENT, schema="combined", num_ctx=args.num_ctx,
+            )
+            combined_json = parse_answer("Planner + Reviewer", combined_raw, verbose)
+            if "planner" not in combined_json or "reviewer" not in combined_json:
+                raise ValueError("Planner + Reviewer did not return valid JSON.")
+            return combined_json["planner"], combined_json["reviewer"]
+        planner_raw = await ask_ollama_async(
+            planner_prompt(topic, content), args.model, args.base_url, use_cache, num_ctx=args.num_ctx,
+        )
+        planner_json = parse_answer("Planner", planner_raw, verbose)
+        reviewer_raw = await ask_ollama_async(
+            reviewer_prompt(topic, planner_json, content), args.model, args.base_url, use_cache, num_ctx=args.num_ctx,
+        )
+        return planner_json, parse_answer("Reviewer", reviewer_raw, verbose)
+
+
+async def plan_and_review_packed(blogs, args, semaphore):
+    """Plan a chunk of blogs in one call and review each blog; failures are returned in place of results.
+
+    With ijson installed, the Planner answer is parsed while it streams in, so each blog's
+    Reviewer starts as soon as its result is complete instead of after the whole answer.
+    """
+    reviews = {}
+
+    def start_review(result):
+        i = result.get("id")
+        if isinstance(i, int) and 1 <= i <= len(blogs) and i not in reviews:
+            topic, content = blogs[i - 1]
+            reviews[i] = asyncio.create_task(review_one(topic, content, result, args, semaphore))
+
+    on_chunk = None
+    if ijson is not None:
+        streamed = ijson.sendable_list()
+        parser = ijson.items_coro(streamed, "results.item", use_float=True)
+
+        def on_chunk(text):
+            nonlocal parser
+            if parser is None:
+                return
+            try:
+                parser.send(text.encode("utf-8"))
+            except ijson.JSONError:
+                # Leave malformed output to extract_json once the answer is complete.
+                parser = None
+            for result in streamed:
+                start_review(result)
+            del streamed[:]
+
+    planner_error = None
+    try:
+        async with semaphore:
+            raw = await ask_ollama_async(
+                batch_planner_prompt(blogs), args.model, args.base_url, not args.no_cache,
+                num_predict=len(blogs) * NUM_PREDICT_PER_AGENT, schema="batch_planner", on_chunk=on_chunk,
+                num_ctx=args.num_ctx,
+            )
+        # Covers cached answers and runs without ijson; already-started reviews are skipped.
+        for result in parse_answer("Planner", raw).get("results", []):
+            start_review(result)
+    except Exception as e:
+        planner_error = e
+
+    outcomes = []
+    for i in range(1, len(blogs) + 1):
+        if i not in reviews:
+            outcomes.append(planner_error or ValueError("Planner returned no result for this blog."))
+            continue
+        try:
+            outcomes.append(await reviews[i])
+        except Exception as e:
+            outcomes.append(e)
+    return outcomes
+
+
+async def review_one(topic, content, planner_json, args, semaphore):
+    """Run Reviewer for one blog whose Planner output came from a packed call."""
+    async with semaphore:
+        reviewer_raw = await ask_ollama_async(
+            reviewer_prompt(topic, planner_json, content), args.model, args.base_url, not args.no_cache,
+            num_ctx=args.num_ctx,
+        )
+    return planner_json, parse_answer("Reviewer", reviewer_raw)
+
+
+def pack_blogs(blogs, pack_size):
+    """Split blogs into the chunks that share one packed Planner call."""
+    return [blogs[i:i + pack_size] for i in range(0, len(blogs), pack_size)]
+
+
+def run_num_ctx(blogs, args):
+    """One context window for the whole run, large enough for its longest prompt plus answer.
+
+    Ollama reloads the model whenever num_ctx changes, so the preload and every call in a
+    run (including concurrent Planner and Reviewer calls in batch mode) must share it.
+    """
+    # Reviewer prompts embed the Planner answer, which is at most NUM_PREDICT_PER_AGENT tokens.
+    calls = [(reviewer_prompt(t, {}, c), 2 * NUM_PREDICT_PER_AGENT) for t, c in blogs]
+    if args.batch_file and args.pack_size > 1:
+        calls += [(batch_planner_prompt(chunk), len(chunk) * NUM_PREDICT_PER_AGENT)
+                  for chunk in pack_blogs(blogs, args.pack_size)]
+    elif not args.two_pass:
+        calls += [(combined_prompt(t, c), 2 * NUM_PREDICT_PER_AGENT) for t, c in blogs]
+    return max((_num_ctx(messages, num_predict) for messages, num_predict in calls), default=MIN_NUM_CTX)
+
+
+async def process_batch(blogs, args):
+    """Process (title, content) pairs concurrently; failures are returned in place of results."""
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    if args.pack_size <= 1:
+        return await asyncio.gather(*(process_one(t, c, args, semaphore) for t, c in blogs), return_exceptions=True)
+
+    # Pack blogs into shared Planner prompts, then review each blog on its own.
+    outcomes = await asyncio.gather(*(plan_and_review_packed(chunk, args, semaphore) for chunk in pack_blogs(blogs, args.pack_size)))
+    return [outcome for chunk_outcomes in outcomes for outcome in chunk_outcomes]
+
+
+def load_blogs(path):
+    """Read (title, content) pairs from a JSONL file with one {"title", "content"} object per line.
+
+    Raises ValueError naming the file and line of the first malformed entry.
+    """
+    blogs = []
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                blog = json.loads(line)
+                blogs.append((blog["title"], blog["content"]))
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f'{path}:{n}: expected {{"title", "content"}}') from e
+    return blogs
+
+
+def run_batch(args):
+    """Run the agents over every blog in --batch-file and print one finalized output per blog."""
+    try:
+        blogs = load_blogs(args.batch_file)
+    except ValueError as e:
+        print(e)
+        return
+    print(f"Processing {len(blogs)} blogs from {args.batch_file}")
+
+    if not wait_ollama(args.base_url):
+        print("Cannot connect to Ollama. Please ensure it's running.")
+        return
+    args.num_ctx = run_num_ctx(blogs, args)
+    warm_model(args.model, args.base_url, args.num_ctx)
+
+    results = asyncio.run(process_batch(blogs, args))
+    for (topic, content), result in zip(blogs, results):
+        print(f"\n##### {topic} #####")
+        if isinstance(result, Exception):
+            print(f"Failed: {result}")
+            continue
+        planner_json, reviewer_json = result
+        finalizer(planner_json, reviewer_json, topic, content, args.email)
+
+
 def main():
     """Main function to orchestrate the multi-agent workflow"""
     parser = argparse.ArgumentParser(description="Two-agent (Planner, Reviewer) demo with JSON output.")
     parser.add_argument("--model", default="phi3:3.8b", type=str, help="Ollama model to use")
-    parser.add_argument("--title", type=str, help="Topic to analyze", required=True)
-    parser.add_argument("--content", type=str, help="Content to analyze for the given topic", required=True)
+    parser.add_argument("--title", type=str, help="Topic to analyze")
+    parser.add_argument("--content", type=str, help="Content to analyze for the given topic")
+    parser.add_argument("--batch-file", type=str, help="JSONL file of {\"title\", \"content\"} blogs to process concurrently")
     parser.add_argument("--base-url", default="http://127.0.0.1:11434")
     parser.add_argument("--email", default="shravankumar.nagarajan@sjsu.edu", type=str, help="Email of the user")
+    parser.add_argument("--pack-size", default=1, type=int, help="With --batch-file, plan this many blogs per Planner call (about 8 works for small models)")
+    parser.add_argument("--no-cache", action="store_true", help="Always query the model instead of reusing cached answers")
+    parser.add_argument("--two-pass", action="store_true", help="Call Planner and Reviewer separately instead of in one combined call")
     args = parser.parse_args()
 
+    if args.pack_size < 1:
+        parser.error("--pack-size must be at least 1")
+    if args.batch_file:
+        run_batch(args)
+        return
+    if not args.title or not args.content:
+        parser.error("--title and --content are required unless --batch-file is given")
+
     topic = args.title
     content = args.content
     email = args.email
@@ -141,25 +626,14 @@ def main():
     if not wait_ollama(args.base_url):
         print("Cannot connect to Ollama. Please ensure it's running.")
         return
+    args.num_ctx = run_num_ctx([(topic, content)], args)
+    warm_model(args.model, args.base_url, args.num_ctx)
 
-    print("\n--- Planner ---\n")
-    planner_raw = ask_ollama(planner_prompt(topic, content), args.model, args.base_url)
-    print(planner_raw)
-    try:
-        planner_json = json.loads(planner_raw[planner_raw.find('{'):planner_raw.rfind('}') + 1])
-    except Exception:
-        print("Planner did not return valid JSON.")
-        return
-
-    print("\n--- Reviewer ---\n")
-    reviewer_raw = ask_ollama(reviewer_prompt(topic, planner_json, content), args.model, args.base_url)
-    print(reviewer_raw)
     try:
-        reviewer_json = json.loads(reviewer_raw[reviewer_raw.find('{'):reviewer_raw.rfind('}') + 1])
-    except Exception:
-        print("Reviewer did not return valid JSON.")
+        planner_json, reviewer_json = asyncio.run(process_one(topic, content, args, asyncio.Semaphore(1), verbose=True))
+    except Exception as e:
+        print(e)
         return
-
     finalizer(planner_json, reviewer_json, topic, content, email)
 
 
@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import json
+import re
+
+import pytest
+
+pytest.importorskip("langchain_ollama")
+
+import agents_demo  # noqa: E402
+
+
+def collect(chunks):
+    collector = agents_demo._JsonCollector()
+    for chunk in chunks:
+        collector.feed(chunk)
+    return collector
+
+
+def test_collector_ignores_braces_inside_strings():
+    collector = collect(['{"summary": "a } and {', ' b", "tags": ["x"]}'])
+    assert collector.complete
+    assert collector.text() == '{"summary": "a } and { b", "tags": ["x"]}'
+
+
+def test_collector_handles_escaped_quotes():
+    collector = collect(['{"a": "say \\"}\\" ', 'now", "b": {"c": "\\\\"}}'])
+    assert collector.complete
+    assert collector.text() == '{"a": "say \\"}\\" now", "b": {"c": "\\\\"}}'
+
+
+def test_collector_drops_text_after_object():
+    collector = agents_demo._JsonCollector()
+    assert collector.feed('Sure! {"a": 1} and') == 'Sure! {"a": 1}'
+    assert collector.feed(' {"b": 2}') == ""
+    assert collector.complete
+    assert agents_demo.extract_json(collector.text()) == {"a": 1}
+
+
+def test_collector_reports_truncated_stream():
+    collector = collect(['{"thought": "x", "data": {"tags": ["a"'])
+    assert not collector.complete
+
+
+class FakeChunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """Stands in for ChatOllama, streaming each queued answer in small chunks."""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    async def astream(self, messages):
+        self.calls += 1
+        answer = self.answers.pop(0)
+        for i in range(0, len(answer), 5):
+            yield FakeChunk(answer[i:i + 5])
+
+
+@pytest.fixture
+def fake_llm(monkeypatch, tmp_path):
+    monkeypatch.setattr(agents_demo, "CACHE_DIR", tmp_path)
+
+    def install(*answers):
+        llm = FakeLLM(answers)
+        monkeypatch.setattr(agents_demo, "get_llm", lambda *args, **kwargs: llm)
+        return llm
+
+    return install
+
+
+def ask(**kwargs):
+    messages = agents_demo.planner_prompt("Vector clocks", "Causality in distributed systems")
+    return asyncio.run(agents_demo.ask_ollama_async(messages, "m", "u", **kwargs))
+
+
+def test_truncated_answer_is_not_cached(fake_llm):
+    llm = fake_llm('{"thought": "x", "data": {"tags": ["a"', '{"thought": "ok"}')
+    with pytest.raises(ValueError):
+        ask()
+    assert ask() == '{"thought": "ok"}'
+    assert ask() == '{"thought": "ok"}'
+    assert llm.calls == 2
+
+
+def test_cache_key_includes_generation_settings(fake_llm):
+    llm = fake_llm('{"a": 1}', '{"a": 2}', '{"a": 3}')
+    assert ask() == '{"a": 1}'
+    assert ask(num_predict=512) == '{"a": 2}'
+    assert ask(schema="combined") == '{"a": 3}'
+    assert ask() == '{"a": 1}'
+    assert llm.calls == 3
+
+
+def test_run_num_ctx_covers_the_largest_call():
+    blogs = [(f"Blog {i}", "word " * 1500) for i in range(8)]
+    args = argparse.Namespace(batch_file="blogs.jsonl", pack_size=8, two_pass=False)
+    num_ctx = agents_demo.run_num_ctx(blogs, args)
+    packed = agents_demo._num_ctx(agents_demo.batch_planner_prompt(blogs), 8 * agents_demo.NUM_PREDICT_PER_AGENT)
+    assert num_ctx == packed > agents_demo.MIN_NUM_CTX
+
+
+def packed_answer(ids):
+    results = [
+        {"id": i, "thought": "t", "message": "m", "data": {"tags": ["a", "b", "c"], "summary": f"plan {i}"}, "issues": []}
+        for i in ids
+    ]
+    return json.dumps({"results": results})
+
+
+def run_packed(monkeypatch, blogs, planner_answer, use_ijson):
+    """Run plan_and_review_packed against a fake model, returning its outcomes and the call log."""
+    if use_ijson:
+        pytest.importorskip("ijson")
+    else:
+        monkeypatch.setattr(agents_demo, "ijson", None)
+    events = []
+
+    async def fake_ask(messages, model, base_url, use_cache=True, schema="agent", on_chunk=None, **kwargs):
+        if schema == "batch_planner":
+            if isinstance(planner_answer, Exception):
+                raise planner_answer
+            for i in range(0, len(planner_answer), 7):
+                if on_chunk is not None:
+                    on_chunk(planner_answer[i:i + 7])
+                await asyncio.sleep(0)
+            events.append("planner done")
+            return planner_answer
+        topic = messages[1].content.splitlines()[0].removeprefix("Topic: ")
+        events.append(f"review {topic}")
+        return json.dumps({"thought": "r", "message": "m", "data": {"tags": ["x", "y", "z"], "summary": topic}, "issues": []})
+
+    monkeypatch.setattr(agents_demo, "ask_ollama_async", fake_ask)
+    args = argparse.Namespace(model="m", base_url="u", no_cache=True, num_ctx=2048)
+
+    async def run():
+        return await agents_demo.plan_and_review_packed(blogs, args, asyncio.Semaphore(8))
+
+    return asyncio.run(run()), events
+
+
+@pytest.mark.parametrize("use_ijson", [True, False])
+def test_packed_results_are_split_by_id(monkeypatch, use_ijson):
+    blogs = [("A", "a"), ("B", "b"), ("C", "c")]
+    outcomes, events = run_packed(monkeypatch, blogs, packed_answer([3, 1]), use_ijson)
+
+    assert outcomes[0][0]["data"]["summary"] == "plan 1"
+    assert outcomes[0][1]["data"]["summary"] == "A"
+    assert outcomes[2][0]["data"]["summary"] == "plan 3"
+    assert outcomes[2][1]["data"]["summary"] == "C"
+    assert isinstance(outcomes[1], ValueError)
+    assert "no result" in str(outcomes[1])
+    # The extract_json fallback must not start a second review for blogs already reviewed mid-stream.
+    assert sorted(e for e in events if e.startswith("review")) == ["review A", "review C"]
+
+
+def test_packed_reviews_start_while_planner_streams(monkeypatch):
+    blogs = [("A", "a"), ("B", "b")]
+    _, events = run_packed(monkeypatch, blogs, packed_answer([1, 2]), use_ijson=True)
+    assert events.index("review A") < events.index("planner done")
+
+
+def test_packed_planner_error_is_returned_for_every_blog(monkeypatch):
+    error = ValueError("Planner did not return valid JSON.")
+    outcomes, events = run_packed(monkeypatch, [("A", "a"), ("B", "b")], error, use_ijson=False)
+    assert outcomes == [error, error]
+    assert events == []
+
+
+def test_code_fence_inside_string_is_not_cut_off(fake_llm):
+    answer = '{"thought": "quotes ```python\\nprint(1)\\n```", "data": {"tags": ["a", "b", "c"], "summary": "s"}}'
+    # The schema already ends generation at the closing brace; a stop string could only fire inside a value.
+    assert getattr(agents_demo.get_llm.__wrapped__("m", "u"), "stop", None) is None
+    fake_llm(answer)
+    assert ask() == answer
+
+
+@pytest.mark.parametrize("line", ['{"title": "B"', '{"title": "B"}', '["B", "b"]'])
+def test_load_blogs_names_the_bad_line(tmp_path, line):
+    path = tmp_path / "blogs.jsonl"
+    path.write_text('{"title": "A", "content": "a"}\n\n' + line + "\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=re.escape(f'{path}:3: expected {{"title", "content"}}')):
+        agents_demo.load_blogs(path)
+
+
+@pytest.mark.parametrize("raw", ['["a", "b"]', "no json here"])
+def test_parse_answer_requires_an_object(raw):
+    with pytest.raises(ValueError, match="Reviewer did not return valid JSON."):
+        agents_demo.parse_answer("Reviewer", raw)